@@ -5,17 +5,83 @@ No external dependencies - Python stdlib only.
 """
 
 import os
+import sys
 import re
 import json
 import subprocess
-import glob
-from typing import Optional, Dict, List, Tuple, Any
+import threading
+import time
+import functools
+import mmap
+import io
+import shutil
+from collections import Counter
+from itertools import compress
+from operator import attrgetter, itemgetter
+from sys import intern
+from typing import Optional, Dict, List, Tuple, Any, Iterator, Union, Callable, Generator, BinaryIO, NamedTuple, TextIO
+
+
+# Fields parse_logs aggregates on (timestamp, Host header, result code, URL),
+# for scanning whole log buffers with findall. Accepts exactly the lines
+# _split_squid_log_line does: optional leading blanks, nine non-empty
+# fields separated by single spaces, then a quoted User-Agent
+_SQUID_RECORD_RE = re.compile(
+    rb'^[ \t]*(\d+\.\d+) [^\s:]*:\S* (?=\S)([^\s:]*)\S* \S+ \S+ \S+ \d+ (?=\S)([^\s:]*)\S* (\S+) "[^\n]*"',
+    re.M
+)
+
+# Host portion of a URL, used when the Host header is missing
+_URL_HOST_RE = re.compile(r'(?:https?://)?([^:/\s]+)', re.ASCII)
+_URL_HOST_BYTES_RE = re.compile(_URL_HOST_RE.pattern.encode('ascii'))
+
+# Field getters for _SQUID_RECORD_RE matches
+_record_timestamp = itemgetter(0)
+_record_host = itemgetter(1)
+_record_key = itemgetter(1, 2)
+
+# Derived fields per (protocol, method, status, decision) line shape; size
+# is capped so malformed input can't grow it without bound
+_shape_cache = {}
+_SHAPE_CACHE_SIZE = 256
+
+# Log bytes per buffer when streaming and per count_squid_records() batch
+_RECORD_BATCH_BYTES = 8 * 1024 * 1024
+
+# Seconds get_network_ipam_cached() trusts its on-disk cache
+NETWORK_CACHE_MAX_AGE = 3600
+
+# Containers started by awf
+AWF_CONTAINERS = ('awf-squid', 'awf-agent')
+
+# Container inspect results for the current run, keyed by name (None = missing)
+_inspect_cache = {}
+_inspect_lock = threading.Lock()
 
 
 # ============================================================================
 # Log Discovery and Parsing
 # ============================================================================
 
+class SquidLogEntry(NamedTuple):
+    """Parsed firewall_detailed log line (see parse_squid_log_line)."""
+    timestamp: float
+    client_ip: str
+    client_port: str
+    domain: str
+    host: str
+    dest_ip: str
+    dest_port: str
+    protocol: str
+    method: str
+    status_code: int
+    decision: str
+    url: str
+    user_agent: str
+    is_allowed: bool
+    is_https: bool
+
+
 def find_squid_logs() -> Optional[str]:
     """
     Auto-discover Squid logs (running container or preserved).
@@ -24,29 +90,19 @@ def find_squid_logs() -> Optional[str]:
         Path to access.log file, or None if not found
     """
     # Try running container first
-    try:
-        result = run_command(
-            ['docker', 'inspect', 'awf-squid', '--format={{.State.Running}}'],
-            capture=True,
-            check=False
-        )
-        if result and result.strip() == 'true':
-            return 'docker:awf-squid:/var/log/squid/access.log'
-    except:
-        pass
+    status, _ = get_container_status('awf-squid')
+    if status == 'running':
+        return 'docker:awf-squid:/var/log/squid/access.log'
 
     # Try preserved logs (most recent)
-    log_dirs = glob.glob('/tmp/squid-logs-*')
-    if log_dirs:
-        # Sort by timestamp in directory name (descending)
-        log_dirs.sort(reverse=True)
-        access_log = os.path.join(log_dirs[0], 'access.log')
+    log_dir = _newest_dir('squid-logs-')
+    if log_dir:
+        access_log = os.path.join(log_dir, 'access.log')
         if os.path.exists(access_log):
             return access_log
 
     # Try work directories
-    work_dirs = glob.glob('/tmp/awf-*')
-    for work_dir in sorted(work_dirs, reverse=True):
+    for work_dir in _dirs_newest_first('awf-'):
         access_log = os.path.join(work_dir, 'squid-logs', 'access.log')
         if os.path.exists(access_log):
             return access_log
@@ -54,125 +110,629 @@ def find_squid_logs() -> Optional[str]:
     return None
 
 
-def read_squid_logs(log_path: str) -> List[str]:
+def _iter_tmp_dirs(prefix: str) -> Iterator[os.DirEntry]:
+    """Yield /tmp subdirectories whose name starts with prefix."""
+    try:
+        it = os.scandir('/tmp')
+    except OSError:
+        return
+
+    with it:
+        for entry in it:
+            if entry.name.startswith(prefix) and entry.is_dir():
+                yield entry
+
+
+def _newest_dir(prefix: str) -> Optional[str]:
     """
-    Read Squid logs from file or running container.
+    Find most recent /tmp/<prefix>* directory.
 
-    Args:
-        log_path: Path to log file or docker:container:path format
+    Directory names end in a timestamp, so the newest sorts last.
 
     Returns:
-        List of log lines
+        Directory path or None if there is none
     """
+    newest = max(_iter_tmp_dirs(prefix), key=attrgetter('name'), default=None)
+    return newest.path if newest else None
+
+
+def _dirs_newest_first(prefix: str) -> List[str]:
+    """List /tmp/<prefix>* directories, most recent first."""
+    entries = list(_iter_tmp_dirs(prefix))
+    entries.sort(key=attrgetter('name'), reverse=True)
+    return [entry.path for entry in entries]
+
+
+def iter_squid_logs(log_path: str, patterns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """
+    Stream Squid log lines from file or running container.
+
+    Lines are yielded as raw bytes as they are read, so memory use doesn't
+    grow with the log size and decoding is left to the parser. Local files
+    are memory-mapped.
+
+    Args:
+        log_path: Path to log file, '-' for stdin, or docker:container:path format
+        patterns: Optional strings to prefilter on with grep -F; lines
+            containing none of them may be left out, so callers must
+            still filter
+
+    Yields:
+        Log lines (bytes)
+    """
+    for buf in _iter_squid_log_buffers(log_path, patterns):
+        if isinstance(buf, mmap.mmap):
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            yield from iter(buf.readline, b'')
+        else:
+            yield from io.BytesIO(buf)
+
+
+def _iter_squid_log_buffers(log_path: str, patterns: Optional[List[str]] = None) -> Iterator[Union[bytes, mmap.mmap]]:
+    """
+    Yield log contents as buffers of whole lines.
+
+    Container logs are streamed from docker exec in chunks. With patterns,
+    lines are prefiltered by grep -F (in the container, or locally if grep
+    is installed); if grep can't run, the unfiltered log is used instead.
+    Otherwise local files are memory-mapped as a single buffer, and stdin
+    is read in chunks.
+    """
+    if log_path == '-':
+        yield from _iter_file_buffers(sys.stdin.buffer)
+        return
+
     if log_path.startswith('docker:'):
         # Format: docker:awf-squid:/var/log/squid/access.log
         parts = log_path.split(':', 2)
         container = parts[1]
         path = parts[2]
-        result = run_command(['docker', 'exec', container, 'cat', path], capture=True)
-        return result.splitlines() if result else []
-    else:
-        # Regular file path
+        if patterns:
+            status = yield from _iter_command_buffers(
+                ['docker', 'exec', '-e', 'LC_ALL=C', container] + _grep_command(patterns, path)
+            )
+            if status is not None and status < 2:
+                return
+        yield from _iter_command_buffers(['docker', 'exec', container, 'cat', path])
+        return
+
+    # Regular file path
+    if patterns and shutil.which('grep'):
+        status = yield from _iter_command_buffers(
+            _grep_command(patterns, log_path),
+            env=dict(os.environ, LC_ALL='C')
+        )
+        if status is not None and status < 2:
+            return
+
+    try:
+        f = open(log_path, 'rb', buffering=1 << 20)
+    except OSError:
+        return
+
+    with f:
         try:
-            with open(log_path, 'r') as f:
-                return f.readlines()
-        except Exception as e:
-            return []
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty or unmappable file (e.g. a pipe): use buffered reads
+            yield from _iter_file_buffers(f)
+            return
 
+        with mm:
+            yield mm
 
-def parse_squid_log_line(line: str) -> Optional[Dict[str, Any]]:
+
+def _grep_command(patterns: List[str], path: str) -> List[str]:
+    """
+    Build grep command printing lines of path that contain any pattern.
+
+    -a keeps grep from reporting "binary file matches" instead of the
+    lines when the log has NUL bytes or invalid UTF-8; callers run it
+    with LC_ALL=C so matching is byte-wise.
+    """
+    cmd = ['grep', '-a', '-F']
+    for pattern in patterns:
+        cmd += ['-e', pattern]
+    return cmd + ['--', path]
+
+
+def _iter_command_buffers(cmd: List[str],
+                          env: Optional[Dict[str, str]] = None) -> Generator[bytes, None, Optional[int]]:
+    """
+    Yield stdout of command as buffers of whole lines.
+
+    Returns:
+        Exit status, or None if the command couldn't be started. A failing
+        command that produced output reports 0, so callers don't fall back
+        and repeat lines.
+    """
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env
+        )
+    except OSError:
+        return None
+
+    produced = False
+    with proc:
+        for buf in _iter_file_buffers(proc.stdout):
+            produced = True
+            yield buf
+
+    return 0 if produced else proc.returncode
+
+
+def _iter_file_buffers(f: BinaryIO) -> Iterator[bytes]:
+    """
+    Read binary stream in buffers of about _RECORD_BATCH_BYTES whole lines.
+
+    Lines stay raw bytes; parsers decode only the fields they use.
+    """
+    while True:
+        buf = f.read(_RECORD_BATCH_BYTES)
+        if not buf:
+            return
+        if not buf.endswith(b'\n'):
+            buf += f.readline()
+        yield buf
+
+
+def read_squid_logs(log_path: str) -> List[str]:
+    """
+    Read Squid logs from file or running container.
+
+    Args:
+        log_path: Path to log file, '-' for stdin, or docker:container:path format
+
+    Returns:
+        List of log lines
+    """
+    return [line.decode('utf-8', 'replace') for line in iter_squid_logs(log_path)]
+
+
+def iter_squid_entries(log_path: str, patterns: Optional[List[str]] = None) -> Iterator[SquidLogEntry]:
+    """
+    Stream parsed Squid log entries from file or running container.
+
+    Only the entry being processed is held in memory; lines that fail to
+    parse are skipped.
+
+    Args:
+        log_path: Path to log file, '-' for stdin, or docker:container:path format
+        patterns: Optional grep -F prefilter (see iter_squid_logs)
+
+    Yields:
+        Parsed entries (see parse_squid_log_line)
+    """
+    for line in iter_squid_logs(log_path, patterns):
+        entry = parse_squid_log_line(line)
+        if entry is not None:
+            yield entry
+
+
+def count_squid_records(
+    log_path: str,
+    select: Optional[Callable[[Tuple[str, bool]], bool]] = None,
+    patterns: Optional[List[str]] = None
+) -> Tuple[Dict[Tuple[str, bool], int], float, float]:
+    """
+    Count log lines per (domain, is_allowed) pair.
+
+    The log is scanned in chunks of whole lines; each chunk is matched with
+    one precompiled findall() and counted with Counter, so per-line work
+    stays in C and decoding, filtering and classification happen once per
+    distinct (host, result code) pair.
+
+    Args:
+        log_path: Path to log file, '-' for stdin, or docker:container:path format
+        select: Optional predicate on (domain, is_allowed); pairs it
+            rejects are neither counted nor included in the time range
+        patterns: Optional grep -F prefilter (see iter_squid_logs); select
+            must reject lines that contain none of the patterns
+
+    Returns:
+        Tuple of (counts in first-seen order, min timestamp, max timestamp);
+        the timestamps are inf/-inf if nothing was counted
+    """
+    counts = {}
+    min_ts = float('inf')
+    max_ts = float('-inf')
+
+    for buf in _iter_squid_log_buffers(log_path, patterns):
+        for timestamps, raw_keys in _scan_squid_record_batches(buf):
+            batch_counts = Counter(raw_keys)
+            selected = set()
+            for raw_key, count in batch_counts.items():
+                key = _decode_record_key(raw_key)
+                if select is None or select(key):
+                    selected.add(raw_key)
+                    counts[key] = counts.get(key, 0) + count
+
+            if not selected:
+                continue
+
+            # Track time range over the selected lines only
+            if len(selected) < len(batch_counts):
+                timestamps = list(compress(timestamps, map(selected.__contains__, raw_keys)))
+            min_ts = min(min_ts, min(timestamps))
+            max_ts = max(max_ts, max(timestamps))
+
+    return counts, min_ts, max_ts
+
+
+def _scan_squid_record_batches(buf: Union[bytes, mmap.mmap]) -> Iterator[Tuple[List[float], List[Tuple[bytes, bytes]]]]:
+    """Extract timestamps and (host, result code) keys from buf, a chunk at a time."""
+    size = len(buf)
+    start = 0
+    while start < size:
+        # End each chunk on a line boundary so ^ matches at the next start
+        newline = buf.find(b'\n', start + _RECORD_BATCH_BYTES)
+        end = size if newline == -1 else newline + 1
+
+        records = _SQUID_RECORD_RE.findall(buf, start, end)
+        start = end
+        if not records:
+            continue
+
+        raw_keys = list(map(_record_key, records))
+
+        # Extract domain from the URL where the Host header is missing
+        if b'-' in map(_record_host, records):
+            for i, record in enumerate(records):
+                if record[1] == b'-':
+                    url_match = _URL_HOST_BYTES_RE.search(record[3])
+                    raw_keys[i] = (url_match.group(1) if url_match else b'-', record[2])
+
+        yield list(map(float, map(_record_timestamp, records))), raw_keys
+
+
+def _decode_record_key(raw_key: Tuple[bytes, bytes]) -> Tuple[str, bool]:
+    """Map a raw (host, result code) key to (domain, is_allowed)."""
+    host, decision = raw_key
+    return (intern(host.decode('utf-8', 'replace')), b'DENIED' not in decision)
+
+
+def find_last_squid_entry(log_path: str, domain: str) -> Optional[SquidLogEntry]:
+    """
+    Find most recent log entry whose domain contains the given string.
+
+    Local files are memory-mapped and searched backwards from the end, so
+    only lines mentioning the domain after its last hit are touched.
+    Other sources are prefiltered with grep and scanned forwards.
+
+    Args:
+        log_path: Path to log file, '-' for stdin, or docker:container:path format
+        domain: Domain (or part of it) to look for
+
+    Returns:
+        Parsed entry or None if not found
+    """
+    if domain and log_path != '-' and not log_path.startswith('docker:'):
+        try:
+            with open(log_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _rfind_squid_entry(mm, domain)
+        except (OSError, ValueError):
+            # Missing, empty or unmappable file: fall back to forward scan
+            pass
+
+    last_entry = None
+    for entry in iter_squid_entries(log_path, [domain] if domain else None):
+        if domain in entry.domain:
+            last_entry = entry
+
+    return last_entry
+
+
+def find_last_squid_entries(log_path: str, domains: List[str]) -> Dict[str, SquidLogEntry]:
+    """
+    Find most recent log entry for each of several domains.
+
+    Local files are searched backwards once per domain, each search
+    stopping at that domain's last hit. Other sources are prefiltered
+    with grep and scanned forwards once for all domains.
+
+    Args:
+        log_path: Path to log file, '-' for stdin, or docker:container:path format
+        domains: Domains (or parts of them) to look for
+
+    Returns:
+        Dict mapping each domain that was found to its parsed entry
+    """
+    if log_path != '-' and not log_path.startswith('docker:'):
+        last_entries = {}
+        for domain in domains:
+            entry = find_last_squid_entry(log_path, domain)
+            if entry is not None:
+                last_entries[domain] = entry
+        return last_entries
+
+    targets = set(domains)
+    last_entries = {}
+    for entry in iter_squid_entries(log_path, domains):
+        entry_domain = entry.domain
+        for target in targets:
+            if target in entry_domain:
+                last_entries[target] = entry
+
+    return last_entries
+
+
+def _rfind_squid_entry(mm: mmap.mmap, domain: str) -> Optional[SquidLogEntry]:
+    """Search mapped log backwards for the last entry matching domain."""
+    needle = domain.encode('utf-8')
+    end = len(mm)
+
+    while True:
+        hit = mm.rfind(needle, 0, end)
+        if hit < 0:
+            return None
+
+        # Expand hit to its surrounding line
+        start = mm.rfind(b'\n', 0, hit) + 1
+        stop = mm.find(b'\n', hit)
+        if stop < 0:
+            stop = len(mm)
+
+        # The hit may be in another field (URL, User-Agent), so verify
+        entry = parse_squid_log_line(mm[start:stop])
+        if entry is not None and domain in entry.domain:
+            return entry
+
+        end = start
+
+
+def _split_squid_log_line(line: str) -> Optional[Tuple[str, ...]]:
+    """
+    Split firewall_detailed line into its fields.
+
+    Accepts the same lines as _SQUID_RECORD_RE, so parse_logs and the
+    per-entry readers agree on which lines count.
+
+    Returns:
+        Tuple of raw fields (timestamp, client_ip, client_port, host,
+        host_port, dest_ip, dest_port, protocol, method, status, decision,
+        hierarchy, url, user_agent), or None if the line does not have the
+        expected shape
+    """
+    line = line.lstrip(' \t')
+    parts = line.split(' ', 9)
+    if len(parts) != 10:
+        return None
+
+    # User-Agent runs from the opening quote to the last quote on the line
+    rest = parts[9]
+    end = rest.rfind('"')
+    if end < 1 or rest[0] != '"':
+        return None
+
+    # Fields are non-empty and hold no other whitespace
+    head = line[:len(line) - len(rest)]
+    if '' in parts or '\t' in head or '\r' in head or '\n' in head or '\f' in head or '\v' in head:
+        return None
+
+    timestamp, client, host, dest, protocol, method, status, tag, url = parts[:9]
+    seconds, dot, millis = timestamp.partition('.')
+    if not (dot and timestamp.isascii() and seconds.isdecimal() and millis.isdecimal()):
+        return None
+
+    client_ip, sep, client_port = client.partition(':')
+    if not sep or not (status.isascii() and status.isdecimal()):
+        return None
+
+    host, _, host_port = host.partition(':')
+    dest_ip, _, dest_port = dest.partition(':')
+    decision, _, hierarchy = tag.partition(':')
+
+    return (timestamp, client_ip, client_port, host, host_port, dest_ip, dest_port,
+            protocol, method, status, decision, hierarchy, url, rest[1:end])
+
+
+def parse_squid_log_line(line: Union[str, bytes]) -> Optional[SquidLogEntry]:
     """
     Parse firewall_detailed format line.
 
     Format: timestamp clientIP:port host:port destIP:port protocol method status decision url userAgent
 
+    Args:
+        line: Log line, as text or raw bytes from iter_squid_logs
+
     Returns:
-        Dict with parsed fields or None if parse failed
+        SquidLogEntry with parsed fields or None if parse failed
     """
-    # Regex for firewall_detailed format
-    pattern = r'(\d+\.\d+) ([\d.]+):(\d+) ([^:\s]+):(\d+) ([^:\s]+):(\d+) ([\S]+) (\w+) (\d+) ([^:]+):(\S+) (\S+) "([^"]*)"'
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', 'replace')
 
-    match = re.match(pattern, line.strip())
-    if not match:
+    fields = _split_squid_log_line(line)
+    if fields is None:
         return None
 
     timestamp, client_ip, client_port, host, host_port, dest_ip, dest_port, \
-        protocol, method, status, decision, hierarchy, url, user_agent = match.groups()
+        protocol, method, status, decision, hierarchy, url, user_agent = fields
 
-    # Extract domain from host field
-    domain = host.split(':')[0] if ':' in host else host
+    client_ip = intern(client_ip)
+
+    # Protocol, method, status and decision form a line "shape" that only
+    # takes a few distinct values, so derive the shape's fields once
+    key = (protocol, method, status, decision)
+    shape = _shape_cache.get(key)
+    if shape is None:
+        shape = _line_shape(protocol, method, status, decision)
+        if len(_shape_cache) < _SHAPE_CACHE_SIZE:
+            _shape_cache[key] = shape
+    protocol, method, status_code, decision, is_allowed, is_https = shape
+
+    try:
+        timestamp = float(timestamp)
+    except ValueError:
+        return None
+
+    # Extract domain from host field; domains repeat across many lines, so
+    # intern them to share one string per domain
+    host = intern(host)
+    domain = host
     if domain == '-':
         # Try to extract from URL
-        url_match = re.search(r'(?:https?://)?([^:/\s]+)', url)
-        domain = url_match.group(1) if url_match else '-'
-
-    # Determine if allowed
-    is_allowed = 'DENIED' not in decision
-
-    return {
-        'timestamp': float(timestamp),
-        'client_ip': client_ip,
-        'client_port': client_port,
-        'domain': domain,
-        'host': host,
-        'dest_ip': dest_ip,
-        'dest_port': dest_port,
-        'protocol': protocol,
-        'method': method,
-        'status_code': int(status),
-        'decision': decision,
-        'url': url,
-        'user_agent': user_agent,
-        'is_allowed': is_allowed,
-        'is_https': method == 'CONNECT'
-    }
+        url_match = _URL_HOST_RE.search(url)
+        domain = intern(url_match.group(1)) if url_match else '-'
+
+    return SquidLogEntry(
+        timestamp, client_ip, client_port, domain, host, dest_ip, dest_port,
+        protocol, method, status_code, decision, url, user_agent,
+        is_allowed, is_https
+    )
+
+
+def _line_shape(protocol: str, method: str, status: str, decision: str) -> Tuple[str, str, int, str, bool, bool]:
+    """
+    Derive per-shape entry fields for parse_squid_log_line.
+
+    Low-cardinality strings are interned, so entries share one object
+    per value and comparisons on them are pointer checks.
+
+    Returns:
+        Tuple of (protocol, method, status_code, decision, is_allowed, is_https)
+    """
+    decision = intern(decision)
+    return (
+        intern(protocol),
+        intern(method),
+        int(status),
+        decision,
+        # Squid may stack suffixes on a code (TCP_DENIED_TIMEDOUT_ABORTED),
+        # so test for DENIED anywhere in it
+        'DENIED' not in decision,
+        method == 'CONNECT'
+    )
 
 
 # ============================================================================
 # Container Operations
 # ============================================================================
 
-def get_container_status(name: str) -> Tuple[str, int]:
+def list_containers(prefix: str = 'awf-') -> List[str]:
     """
-    Get container running/stopped/missing status.
+    List containers (running or stopped) whose name starts with prefix.
+
+    The docker query is memoized by run_command, so callers in the same
+    run share one docker ps.
 
     Returns:
-        Tuple of (status, exit_code) where status is 'running', 'stopped', or 'missing'
+        List of container names
     """
-    try:
-        # Check if container exists
-        result = run_command(
-            ['docker', 'ps', '-a', '--filter', f'name=^{name}$', '--format={{.Names}}'],
-            capture=True,
-            check=False
-        )
+    result = run_command(
+        ['docker', 'ps', '-a', '--filter', f'name=^{prefix}', '--format={{.Names}}'],
+        capture=True,
+        check=False
+    )
+    return result.split() if result else []
 
-        if not result or result.strip() != name:
-            return ('missing', -1)
 
-        # Check if running
-        result = run_command(
-            ['docker', 'inspect', name, '--format={{.State.Running}}'],
-            capture=True,
-            check=False
-        )
+def batch_inspect(names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Inspect several containers with a single docker call.
 
-        if result and result.strip() == 'true':
-            return ('running', 0)
+    Args:
+        names: Container names
 
-        # Get exit code
-        result = run_command(
-            ['docker', 'inspect', name, '--format={{.State.ExitCode}}'],
-            capture=True,
-            check=False
-        )
+    Returns:
+        Dict keyed by container name with 'state', 'running', 'exit_code',
+        'health', 'ip' and 'networks' (network name -> IP) keys; containers
+        that don't exist are omitted
+    """
+    result = run_command(
+        ['docker', 'inspect', '--type=container', '--format={{json .}}', *names],
+        capture=True,
+        check=False
+    )
 
-        exit_code = int(result.strip()) if result else -1
-        return ('stopped', exit_code)
+    info = {}
+    for line in (result or '').splitlines():
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
 
-    except Exception:
+        state = data.get('State') or {}
+        health = state.get('Health') or {}
+        networks = (data.get('NetworkSettings') or {}).get('Networks') or {}
+        ips = {net: n['IPAddress'] for net, n in networks.items() if n.get('IPAddress')}
+
+        info[data.get('Name', '').lstrip('/')] = {
+            'state': state.get('Status'),
+            'running': bool(state.get('Running')),
+            'exit_code': state.get('ExitCode', -1),
+            'health': health.get('Status') or None,
+            'ip': ''.join(ips.values()) or None,
+            'networks': ips
+        }
+
+    return info
+
+
+def status_from_inspect(info: Optional[Dict[str, Any]]) -> Tuple[str, int]:
+    """
+    Map batch_inspect() info to container status.
+
+    Args:
+        info: Info dict for one container, or None if it doesn't exist
+
+    Returns:
+        Tuple of (status, exit_code) where status is 'running', 'stopped', or 'missing'
+    """
+    if info is None:
         return ('missing', -1)
 
+    if info['running']:
+        return ('running', 0)
+
+    return ('stopped', info['exit_code'])
+
+
+def _inspect(name: str) -> Optional[Dict[str, Any]]:
+    """
+    Get inspect info for container from the per-run cache.
+
+    The first lookup lists awf containers and inspects the ones that
+    exist in a single call, so later lookups don't spawn docker again.
+
+    Returns:
+        Inspect info dict or None if container is missing
+    """
+    # Checks may run concurrently; only one of them should fetch
+    with _inspect_lock:
+        if name not in _inspect_cache:
+            names = [name] + [n for n in AWF_CONTAINERS if n != name and n not in _inspect_cache]
+            # Only inspect containers that exist, so docker inspect doesn't error
+            existing = set(list_containers())
+            present = [n for n in names if n in existing]
+            fetched = batch_inspect(present) if present else {}
+            for n in names:
+                _inspect_cache[n] = fetched.get(n)
+
+        return _inspect_cache[name]
+
+
+def clear_inspect_cache() -> None:
+    """Forget cached container state so the next lookup re-inspects."""
+    with _inspect_lock:
+        _inspect_cache.clear()
+
+
+def get_container_status(name: str) -> Tuple[str, int]:
+    """
+    Get container running/stopped/missing status.
+
+    Returns:
+        Tuple of (status, exit_code) where status is 'running', 'stopped', or 'missing'
+    """
+    return status_from_inspect(_inspect(name))
+
 
 def get_container_ip(name: str) -> Optional[str]:
     """
@@ -181,16 +741,8 @@ def get_container_ip(name: str) -> Optional[str]:
     Returns:
         IP address or None if container not found/not connected
     """
-    try:
-        result = run_command(
-            ['docker', 'inspect', name, '--format={{range .NetworkSettings.Networks}}{{.IPAddress}}{{end}}'],
-            capture=True,
-            check=False
-        )
-        ip = result.strip() if result else None
-        return ip if ip and ip != '' else None
-    except Exception:
-        return None
+    info = _inspect(name)
+    return info['ip'] if info else None
 
 
 def check_container_health(name: str) -> Optional[str]:
@@ -200,20 +752,8 @@ def check_container_health(name: str) -> Optional[str]:
     Returns:
         'healthy', 'unhealthy', 'starting', or None if no healthcheck
     """
-    try:
-        result = run_command(
-            ['docker', 'inspect', name, '--format={{.State.Health.Status}}'],
-            capture=True,
-            check=False
-        )
-        status = result.strip() if result else None
-
-        # If no healthcheck, result is '<no value>'
-        if status and status != '<no value>':
-            return status
-        return None
-    except Exception:
-        return None
+    info = _inspect(name)
+    return info['health'] if info else None
 
 
 def get_container_processes(name: str, limit: int = 5) -> List[Dict[str, str]]:
@@ -237,7 +777,8 @@ def get_container_processes(name: str, limit: int = 5) -> List[Dict[str, str]]:
         processes = []
 
         for line in lines[:limit]:
-            parts = line.split()
+            # Command arguments stay unsplit in the 12th field
+            parts = line.split(None, 11)
             if len(parts) >= 11:
                 processes.append({
                     'name': parts[10],
@@ -254,19 +795,27 @@ def get_container_logs(name: str, tail: int = 5) -> List[str]:
     """
     Get recent container logs.
 
+    Only the last tail lines are sent by the daemon. The container's
+    stderr is merged in (docker logs replays it on stderr) and output is
+    decoded leniently, so binary or non-UTF-8 log bytes don't drop the logs.
+
     Returns:
         List of log lines
     """
     try:
-        result = run_command(
+        result = subprocess.run(
             ['docker', 'logs', '--tail', str(tail), name],
-            capture=True,
-            check=False
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
         )
-        return result.splitlines() if result else []
     except Exception:
         return []
 
+    if result.returncode != 0:
+        return []
+
+    return result.stdout.decode('utf-8', 'replace').splitlines()
+
 
 # ============================================================================
 # Squid Configuration
@@ -280,8 +829,7 @@ def find_squid_config() -> Optional[str]:
         Path to squid.conf or None if not found
     """
     # Try work directories (most recent)
-    work_dirs = glob.glob('/tmp/awf-*')
-    for work_dir in sorted(work_dirs, reverse=True):
+    for work_dir in _dirs_newest_first('awf-'):
         squid_conf = os.path.join(work_dir, 'squid.conf')
         if os.path.exists(squid_conf):
             return squid_conf
@@ -305,6 +853,22 @@ def read_squid_config(config_path: Optional[str] = None) -> Optional[str]:
     if config_path is None:
         return None
 
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return None
+
+    return _load_squid_config(config_path, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_squid_config(config_path: str, mtime_ns: int, size: int) -> Optional[str]:
+    """
+    Read Squid config from disk.
+
+    Cached on (path, mtime, size) so repeated reads are free until the
+    file changes.
+    """
     try:
         with open(config_path, 'r') as f:
             return f.read()
@@ -317,41 +881,107 @@ def get_allowed_domains(squid_config: str) -> List[str]:
     Extract allowed domains from Squid config.
 
     Returns:
-        List of allowed domain patterns
+        Sorted list of unique allowed domain patterns
     """
+    return list(_parse_allowed_domains(squid_config))
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_allowed_domains(squid_config: str) -> Tuple[str, ...]:
+    """Scan config for allowed_domains ACLs in a single pass."""
     domains = []
+    in_acl_block = False
 
-    # Look for ACL lines defining allowed_domains
     for line in squid_config.splitlines():
         line = line.strip()
-        if line.startswith('acl allowed_domains') and 'dstdomain' in line:
+        if not line or line[0] == '#':
+            continue
+
+        if line.startswith('acl allowed_domains ') and 'dstdomain' in line:
             # Format: acl allowed_domains dstdomain "/etc/squid/allowed_domains.txt"
             # or: acl allowed_domains dstdomain .github.com github.com
-            parts = line.split()
-            if len(parts) > 3:
-                # Check if it's a file reference
-                if parts[3].startswith('"'):
-                    continue
-                # Inline domains
-                domains.extend(parts[3:])
-
-    # Also check for inline domain definitions after the ACL line
-    in_acl_block = False
-    for line in squid_config.splitlines():
-        line = line.strip()
-        if 'acl allowed_domains dstdomain' in line:
             in_acl_block = True
             parts = line.split()
             if len(parts) > 3 and not parts[3].startswith('"'):
+                # Inline domains (file references are skipped)
                 domains.extend(parts[3:])
-        elif in_acl_block and line and not line.startswith('#'):
-            # Continuation lines
-            if line.startswith('acl') or line.startswith('http_access'):
+        elif in_acl_block:
+            # Continuation lines run until the next directive
+            if line.startswith(('acl', 'http_access')):
                 in_acl_block = False
             else:
                 domains.extend(line.split())
 
-    return [d.strip('"') for d in domains if d and not d.startswith('#')]
+    # The same domain may be listed on several ACL lines
+    return tuple(sorted({d.strip('"') for d in domains if d and not d.startswith('#')}))
+
+
+def get_allowed_domains_cached(config_path: Optional[str] = None) -> Optional[Tuple[str, ...]]:
+    """
+    Get allowed domains from Squid config, cached on disk between runs.
+
+    The parsed allowlist is stored as JSON in the user cache directory
+    together with the config's (path, mtime, size), and reused until the
+    config changes.
+
+    Args:
+        config_path: Path to squid.conf, or None to auto-discover
+
+    Returns:
+        Sorted tuple of unique allowed domain patterns, or None if no
+        config was found
+    """
+    if config_path is None:
+        config_path = find_squid_config()
+
+    if config_path is None:
+        return None
+
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return None
+
+    return _load_allowed_domains(config_path, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_allowed_domains(config_path: str, mtime_ns: int, size: int) -> Optional[Tuple[str, ...]]:
+    """Load allowlist from the JSON cache, re-parsing the config on a miss."""
+    key = [os.path.abspath(config_path), mtime_ns, size]
+    cache_path = user_cache_path('allowlist.json')
+
+    try:
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+        domains = cached['domains']
+        if cached['key'] == key and all(isinstance(d, str) for d in domains):
+            return tuple(domains)
+    except (OSError, ValueError, TypeError, KeyError):
+        # Missing, stale-format or corrupt cache: rebuild it
+        pass
+
+    config = _load_squid_config(config_path, mtime_ns, size)
+    if config is None:
+        return None
+
+    domains = _parse_allowed_domains(config)
+
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump({'key': key, 'domains': domains}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Cache is best-effort
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    return domains
 
 
 # ============================================================================
@@ -370,6 +1000,14 @@ def run_command(cmd: List[str], capture: bool = True, check: bool = True) -> Opt
     Returns:
         Command output (stdout) if capture=True, else None
     """
+    if capture and not check and _is_read_only_docker(cmd):
+        return _cached_run(tuple(cmd))
+
+    return _run_command(cmd, capture, check)
+
+
+def _run_command(cmd: List[str], capture: bool, check: bool) -> Optional[str]:
+    """Run command without caching (see run_command)."""
     try:
         if capture:
             result = subprocess.run(
@@ -390,6 +1028,33 @@ def run_command(cmd: List[str], capture: bool = True, check: bool = True) -> Opt
         return None
 
 
+def _is_read_only_docker(cmd: List[str]) -> bool:
+    """Check if command is a docker query that doesn't change any state."""
+    if len(cmd) < 2 or cmd[0] != 'docker':
+        return False
+
+    subcommand = cmd[1]
+    if subcommand in ('ps', 'inspect', 'logs'):
+        return True
+    if subcommand == 'network':
+        return len(cmd) > 2 and cmd[2] in ('ls', 'inspect')
+    if subcommand == 'exec':
+        # docker exec <container> cat <path>
+        return len(cmd) > 3 and cmd[3] == 'cat'
+
+    return False
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_run(cmd: Tuple[str, ...]) -> Optional[str]:
+    """Memoized run_command(cmd, capture=True, check=False)."""
+    return _run_command(list(cmd), True, False)
+
+
+# Drop memoized docker query results (e.g. at the start of a diagnostic run)
+run_command.cache_clear = _cached_run.cache_clear
+
+
 def format_table(headers: List[str], rows: List[List[str]], align: Optional[List[str]] = None) -> str:
     """
     Format data as aligned table.
@@ -402,35 +1067,47 @@ def format_table(headers: List[str], rows: List[List[str]], align: Optional[List
     Returns:
         Formatted table string
     """
+    buf = io.StringIO()
+    write_table(headers, rows, buf, align)
+    return buf.getvalue()[:-1]
+
+
+def write_table(headers: List[str], rows: List[List[str]], out: TextIO,
+                align: Optional[List[str]] = None) -> None:
+    """
+    Write data as aligned table, one newline-terminated line at a time.
+
+    Args:
+        headers: Column headers
+        rows: Data rows
+        out: Text stream to write to
+        align: List of 'left' or 'right' for each column (default: all left)
+    """
     if not rows:
-        return ""
+        return
 
     if align is None:
         align = ['left'] * len(headers)
 
-    # Calculate column widths
+    # Stringify cells once and calculate column widths in the same pass
     widths = [len(h) for h in headers]
+    str_rows = []
     for row in rows:
-        for i, cell in enumerate(row):
-            widths[i] = max(widths[i], len(str(cell)))
+        cells = [str(cell) for cell in row]
+        for i, cell in enumerate(cells):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
+        str_rows.append(cells)
 
-    # Format header
-    header_line = "  ".join(
-        h.ljust(widths[i]) if align[i] == 'left' else h.rjust(widths[i])
-        for i, h in enumerate(headers)
-    )
-    separator = "  ".join("=" * w for w in widths)
+    # One format string for every line
+    fmt = "  ".join(
+        ("{:<%d}" if a == 'left' else "{:>%d}") % w
+        for w, a in zip(widths, align)
+    ) + "\n"
 
-    # Format rows
-    lines = [header_line, separator]
-    for row in rows:
-        line = "  ".join(
-            str(cell).ljust(widths[i]) if align[i] == 'left' else str(cell).rjust(widths[i])
-            for i, cell in enumerate(row)
-        )
-        lines.append(line)
-
-    return "\n".join(lines)
+    out.write(fmt.format(*headers))
+    out.write("  ".join("=" * w for w in widths) + "\n")
+    out.writelines(fmt.format(*cells) for cells in str_rows)
 
 
 def format_json(data: Any, pretty: bool = True) -> str:
@@ -445,9 +1122,11 @@ def format_json(data: Any, pretty: bool = True) -> str:
         JSON string
     """
     if pretty:
+        # Human-facing output keeps non-ASCII characters readable
         return json.dumps(data, indent=2, ensure_ascii=False)
     else:
-        return json.dumps(data, ensure_ascii=False)
+        # Compact, ASCII-escaped output takes the C encoder's fast path
+        return json.dumps(data, separators=(',', ':'))
 
 
 def check_network_exists(network_name: str = 'awf-net') -> bool:
@@ -468,6 +1147,93 @@ def check_network_exists(network_name: str = 'awf-net') -> bool:
         return False
 
 
+def get_network_ipam(network_name: str = 'awf-net') -> Optional[List[Dict[str, Any]]]:
+    """
+    Get IPAM config of Docker network.
+
+    Doubles as an existence check, so callers don't need
+    check_network_exists() first.
+
+    Returns:
+        List of IPAM config dicts (Subnet, Gateway, ...), or None if network doesn't exist
+    """
+    result = run_command(
+        ['docker', 'network', 'inspect', network_name, '--format={{json .IPAM.Config}}'],
+        capture=True,
+        check=False
+    )
+    if not result or not result.strip():
+        return None
+
+    try:
+        return json.loads(result) or []
+    except ValueError:
+        return []
+
+
+def get_network_ipam_cached(network_name: str = 'awf-net',
+                            max_age: float = NETWORK_CACHE_MAX_AGE) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get IPAM config of Docker network, cached on disk.
+
+    Subnet and gateway virtually never change between runs, so the result
+    of get_network_ipam() is kept in the user cache directory for max_age
+    seconds. A missing network is never cached and drops the cache entry.
+
+    Returns:
+        List of IPAM config dicts (Subnet, Gateway, ...), or None if network doesn't exist
+    """
+    path = user_cache_path(f'net-{network_name}.json')
+    try:
+        if time.time() - os.stat(path).st_mtime < max_age:
+            with open(path, 'r') as f:
+                ipam = json.load(f)
+            if isinstance(ipam, list):
+                return ipam
+    except (OSError, ValueError):
+        pass
+
+    ipam = get_network_ipam(network_name)
+    if ipam is None:
+        clear_network_cache(network_name)
+        return None
+
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(ipam, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Cache is best-effort
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    return ipam
+
+
+def clear_network_cache(network_name: str = 'awf-net') -> None:
+    """Drop the on-disk get_network_ipam_cached() entry for network."""
+    try:
+        os.remove(user_cache_path(f'net-{network_name}.json'))
+    except OSError:
+        pass
+
+
+def user_cache_path(filename: str) -> str:
+    """
+    Get path of file in the awf user cache directory.
+
+    Uses $XDG_CACHE_HOME/awf, defaulting to ~/.cache/awf. The directory
+    may not exist yet.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'awf', filename)
+
+
 def test_connectivity(host: str, port: int, container: str = 'awf-agent') -> bool:
     """
     Test network connectivity from container.
@@ -7,7 +7,10 @@ Reports issues concisely with actionable fixes.
 import sys
 import os
 import argparse
-from typing import List, Dict, Tuple
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.dirname(__file__))
@@ -24,6 +27,49 @@ class DiagnosticCheck:
         self.fix = fix
 
 
+# Marks the boundary between probe outputs in _agent_probe()
+_PROBE_SEPARATOR = '--awf-probe--'
+
+# Agent-side probes, run in one exec session: DNS config, then Squid reachability
+_AGENT_PROBE_SCRIPT = (
+    'cat /etc/resolv.conf; '
+    f'echo; echo {_PROBE_SEPARATOR}; '
+    'nc -zv -w 2 172.30.0.10 3128 2>&1'
+)
+
+_agent_probe_lock = threading.Lock()
+
+
+def _agent_probe() -> Dict[str, str]:
+    """
+    Run agent-side probes with a single docker exec.
+
+    Cached for the diagnostic pass (run_diagnostics resets it), so the
+    checks that need agent data share one exec session.
+
+    Returns:
+        Dict with 'resolv' and 'nc' output (empty if agent isn't running)
+    """
+    with _agent_probe_lock:
+        return _run_agent_probe()
+
+
+@functools.lru_cache(maxsize=1)
+def _run_agent_probe() -> Dict[str, str]:
+    """Uncached body of _agent_probe()."""
+    result = None
+    agent_status, _ = common.get_container_status('awf-agent')
+    if agent_status == 'running':
+        result = common.run_command(
+            ['docker', 'exec', 'awf-agent', 'sh', '-c', _AGENT_PROBE_SCRIPT],
+            capture=True,
+            check=False
+        )
+
+    resolv, _, nc = (result or '').partition(f'\n{_PROBE_SEPARATOR}\n')
+    return {'resolv': resolv, 'nc': nc}
+
+
 def check_containers() -> DiagnosticCheck:
     """Check if awf containers exist and their status."""
     squid_status, squid_exit = common.get_container_status('awf-squid')
@@ -81,31 +127,9 @@ def check_squid_health() -> DiagnosticCheck:
 
 def check_network() -> DiagnosticCheck:
     """Check if awf network exists."""
-    exists = common.check_network_exists('awf-net')
-
-    if exists:
-        # Get network details
-        try:
-            result = common.run_command(
-                ['docker', 'network', 'inspect', 'awf-net', '--format={{.IPAM.Config}}'],
-                capture=True,
-                check=False
-            )
-            subnet = result.strip() if result else "unknown"
-            return DiagnosticCheck(
-                "Network",
-                True,
-                f"awf-net exists ({subnet})",
-                ""
-            )
-        except:
-            return DiagnosticCheck(
-                "Network",
-                True,
-                "awf-net exists",
-                ""
-            )
-    else:
+    ipam = common.get_network_ipam('awf-net')
+
+    if ipam is None:
         return DiagnosticCheck(
             "Network",
             False,
@@ -113,6 +137,15 @@ def check_network() -> DiagnosticCheck:
             "Network is created automatically when running awf"
         )
 
+    subnets = [c['Subnet'] for c in ipam if c.get('Subnet')]
+    subnet = ", ".join(subnets) if subnets else "unknown"
+    return DiagnosticCheck(
+        "Network",
+        True,
+        f"awf-net exists ({subnet})",
+        ""
+    )
+
 
 def check_connectivity() -> DiagnosticCheck:
     """Check if agent can reach Squid."""
@@ -127,8 +160,9 @@ def check_connectivity() -> DiagnosticCheck:
             ""
         )
 
-    # Test connectivity
-    reachable = common.test_connectivity('172.30.0.10', 3128, 'awf-agent')
+    # Test connectivity (nc reports "succeeded" or "open" on success)
+    nc_output = _agent_probe()['nc'].lower()
+    reachable = 'succeeded' in nc_output or 'open' in nc_output
 
     if reachable:
         return DiagnosticCheck(
@@ -160,14 +194,14 @@ def check_dns_config() -> DiagnosticCheck:
 
     # Read /etc/resolv.conf
     try:
-        result = common.run_command(
-            ['docker', 'exec', 'awf-agent', 'cat', '/etc/resolv.conf'],
-            capture=True,
-            check=False
-        )
+        result = _agent_probe()['resolv']
 
         if result:
-            nameservers = [line.split()[1] for line in result.splitlines() if line.strip().startswith('nameserver')]
+            nameservers = []
+            for line in result.splitlines():
+                parts = line.split(None, 2)
+                if len(parts) > 1 and parts[0] == 'nameserver':
+                    nameservers.append(parts[1])
             if nameservers:
                 return DiagnosticCheck(
                     "DNS",
@@ -188,9 +222,9 @@ def check_dns_config() -> DiagnosticCheck:
 
 def check_squid_config() -> DiagnosticCheck:
     """Check Squid configuration."""
-    config = common.read_squid_config()
+    domains = common.get_allowed_domains_cached()
 
-    if config is None:
+    if domains is None:
         return DiagnosticCheck(
             "Config",
             False,
@@ -198,8 +232,6 @@ def check_squid_config() -> DiagnosticCheck:
             "Config is in /tmp/awf-<timestamp>/squid.conf when containers running"
         )
 
-    domains = common.get_allowed_domains(config)
-
     if domains:
         domain_count = len(domains)
         sample = domains[:3]
@@ -222,17 +254,45 @@ def check_squid_config() -> DiagnosticCheck:
         )
 
 
-def check_common_issues() -> List[DiagnosticCheck]:
-    """Check for common issues."""
-    checks = []
+def _port_listeners(port: int) -> Optional[str]:
+    """
+    Describe processes listening on a local TCP port.
 
-    # Check for port conflicts
-    try:
+    Uses ss on Linux (much faster than lsof) and lsof elsewhere or when
+    ss isn't installed.
+
+    Returns:
+        Listener lines, or None/empty if nothing is listening
+    """
+    if sys.platform.startswith('linux'):
         result = common.run_command(
-            ['lsof', '-i', ':3128'],
+            ['ss', '-ltnp', f'sport = :{port}'],
             capture=True,
             check=False
         )
+        if result is not None:
+            # Drop the header line ss always prints
+            return "\n".join(result.splitlines()[1:])
+
+    return common.run_command(
+        ['lsof', '-i', f':{port}'],
+        capture=True,
+        check=False
+    )
+
+
+def check_common_issues(squid_status: str) -> List[DiagnosticCheck]:
+    """
+    Check for common issues.
+
+    Args:
+        squid_status: awf-squid status from common.get_container_status()
+    """
+    checks = []
+
+    # Check for port conflicts (a running Squid owns the port itself)
+    if squid_status != 'running':
+        result = _port_listeners(3128)
         if result and 'squid' not in result.lower():
             checks.append(DiagnosticCheck(
                 "Port 3128",
@@ -240,27 +300,16 @@ def check_common_issues() -> List[DiagnosticCheck]:
                 "Port 3128 in use by another process",
                 "Stop other process using port 3128"
             ))
-    except:
-        pass
 
     # Check for orphaned containers
-    try:
-        result = common.run_command(
-            ['docker', 'ps', '-a', '--filter', 'name=awf-', '--format={{.Names}}'],
-            capture=True,
-            check=False
-        )
-        if result:
-            containers = result.strip().splitlines()
-            if len(containers) > 2:
-                checks.append(DiagnosticCheck(
-                    "Orphaned",
-                    False,
-                    f"{len(containers)} awf containers found (expected 2)",
-                    "Clean up with: docker rm -f $(docker ps -a --filter name=awf- -q)"
-                ))
-    except:
-        pass
+    containers = common.list_containers('awf-')
+    if len(containers) > 2:
+        checks.append(DiagnosticCheck(
+            "Orphaned",
+            False,
+            f"{len(containers)} awf containers found (expected 2)",
+            "Clean up with: docker rm -f $(docker ps -a --filter name=awf- -q)"
+        ))
 
     return checks
 
@@ -272,15 +321,26 @@ def run_diagnostics(verbose: bool = False) -> Tuple[List[DiagnosticCheck], int]:
     Returns:
         Tuple of (checks, issue_count)
     """
-    checks = []
+    common.run_command.cache_clear()
+    common.clear_inspect_cache()
+    _run_agent_probe.cache_clear()
+    # Checks are independent and mostly wait on docker, so run them in parallel
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [
+            executor.submit(check)
+            for check in (
+                check_containers,
+                check_squid_health,
+                check_network,
+                check_connectivity,
+                check_dns_config,
+                check_squid_config
+            )
+        ]
+        checks = [f.result() for f in futures]
 
-    checks.append(check_containers())
-    checks.append(check_squid_health())
-    checks.append(check_network())
-    checks.append(check_connectivity())
-    checks.append(check_dns_config())
-    checks.append(check_squid_config())
-    checks.extend(check_common_issues())
+    squid_status, _ = common.get_container_status('awf-squid')
+    checks.extend(check_common_issues(squid_status))
 
     issue_count = sum(1 for c in checks if not c.passed)
 
@@ -7,23 +7,29 @@ Shows status, health, processes, logs without verbose docker output.
 import sys
 import os
 import argparse
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, TextIO
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 import common
 
 
-def inspect_container(name: str, tail: int = 5) -> Dict:
+def inspect_container(name: str, info: Optional[Dict], tail: int = 5) -> Dict:
     """
     Inspect single container.
 
+    Args:
+        name: Container name
+        info: Pre-fetched common.batch_inspect() entry, or None if missing
+        tail: Number of log lines to include
+
     Returns:
         Dict with container info
     """
-    status, exit_code = common.get_container_status(name)
+    status, exit_code = common.status_from_inspect(info)
 
-    info = {
+    result = {
         'name': name,
         'status': status,
         'exit_code': exit_code if status == 'stopped' else None,
@@ -35,98 +41,96 @@ def inspect_container(name: str, tail: int = 5) -> Dict:
     }
 
     if status == 'missing':
-        return info
+        return result
 
     # Get IP and network
-    ip = common.get_container_ip(name)
-    if ip:
-        info['ip'] = ip
-        info['network'] = 'awf-net'
+    if info['ip']:
+        result['ip'] = info['ip']
+        result['network'] = 'awf-net' if 'awf-net' in info['networks'] else next(iter(info['networks']))
 
     # Get health
-    health = common.check_container_health(name)
-    if health:
-        info['health'] = health
+    if info['health']:
+        result['health'] = info['health']
 
     # Get processes (only if running)
     if status == 'running':
         processes = common.get_container_processes(name, limit=5)
-        info['processes'] = processes
+        result['processes'] = processes
 
     # Get logs
     logs = common.get_container_logs(name, tail=tail)
-    info['logs'] = logs
+    result['logs'] = logs
 
-    return info
+    return result
 
 
-def get_network_info() -> Dict:
+def get_network_info(inspected: Dict[str, Dict]) -> Dict:
     """
     Get network information.
 
+    Args:
+        inspected: common.batch_inspect() result for the awf containers
+
     Returns:
         Dict with network info
     """
-    if not common.check_network_exists('awf-net'):
+    # A cached subnet can only be stale if awf-net was recreated, which
+    # leaves the containers detached from the network it describes
+    if not any('awf-net' in info['networks'] for info in inspected.values()):
+        common.clear_network_cache('awf-net')
+
+    ipam = common.get_network_ipam_cached('awf-net')
+    if ipam is None:
         return {'exists': False}
 
-    try:
-        # Get subnet
-        result = common.run_command(
-            ['docker', 'network', 'inspect', 'awf-net', '--format={{range .IPAM.Config}}{{.Subnet}}{{end}}'],
-            capture=True,
-            check=False
-        )
-        subnet = result.strip() if result else 'unknown'
-
-        # Get gateway
-        result = common.run_command(
-            ['docker', 'network', 'inspect', 'awf-net', '--format={{range .IPAM.Config}}{{.Gateway}}{{end}}'],
-            capture=True,
-            check=False
-        )
-        gateway = result.strip() if result else 'unknown'
-
-        # Get connected containers
-        squid_ip = common.get_container_ip('awf-squid')
-        agent_ip = common.get_container_ip('awf-agent')
-
-        containers = []
-        if squid_ip:
-            containers.append(f"awf-squid ({squid_ip})")
-        if agent_ip:
-            containers.append(f"awf-agent ({agent_ip})")
-
-        return {
-            'exists': True,
-            'subnet': subnet,
-            'gateway': gateway,
-            'containers': containers
-        }
-    except:
-        return {'exists': True, 'subnet': 'unknown'}
-
-
-def format_text_output(containers: List[Dict], network: Dict, logs_only: bool) -> str:
-    """Format results as text."""
-    lines = []
+    config = ipam[0] if ipam else {}
+
+    # Get connected containers
+    containers = []
+    for name in common.AWF_CONTAINERS:
+        ip = inspected.get(name, {}).get('ip')
+        if ip:
+            containers.append(f"{name} ({ip})")
+
+    return {
+        'exists': True,
+        'subnet': config.get('Subnet') or 'unknown',
+        'gateway': config.get('Gateway') or 'unknown',
+        'containers': containers
+    }
+
+
+def _truncate(line: str, width: int = 100) -> str:
+    """Truncate long line to width characters, marking the cut with '...'."""
+    return line if len(line) <= width else f"{line[:width]}..."
+
+
+def write_text_output(containers: List[Dict], network: Dict, logs_only: bool,
+                      out: Optional[TextIO] = None) -> None:
+    """
+    Write results as text.
+
+    Lines go straight to out (default: stdout) instead of being joined
+    into one string first, so long log tails aren't held twice.
+    """
+    write = (out or sys.stdout).write
 
     if logs_only:
         # Only show logs
         for container in containers:
             if container['logs']:
-                lines.append(f"=== {container['name']} logs ===")
-                lines.extend(container['logs'])
-                lines.append("")
-        return "\n".join(lines)
+                write(f"=== {container['name']} logs ===\n")
+                write("".join(f"{log}\n" for log in container['logs']))
+                write("\n")
+        return
 
     # Full output
     for container in containers:
-        lines.append(f"Container: {container['name']}")
+        write(f"Container: {container['name']}\n")
 
         if container['status'] == 'missing':
-            lines.append("  Status: Not found")
-            lines.append("")
+            write("  Status: Not found\n")
+            write("\n")
             continue
 
         # Status
@@ -139,44 +143,39 @@ def format_text_output(containers: List[Dict], network: Dict, logs_only: bool) -
             else:
                 status_str = "Running"
 
-        lines.append(f"  Status: {status_str}")
+        write(f"  Status: {status_str}\n")
 
         # IP and network
         if container['ip']:
-            lines.append(f"  IP: {container['ip']}")
+            write(f"  IP: {container['ip']}\n")
             if container['network']:
-                lines.append(f"  Network: {container['network']}")
+                write(f"  Network: {container['network']}\n")
 
         # Processes
         if container['processes']:
-            lines.append("")
-            lines.append("  Top Processes:")
+            write("\n")
+            write("  Top Processes:\n")
             for proc in container['processes']:
-                lines.append(f"    {proc['name']:<15} PID {proc['pid']:<6} CPU {proc['cpu']}%")
+                write(f"    {proc['name']:<15} PID {proc['pid']:<6} CPU {proc['cpu']}%\n")
 
         # Logs
         if container['logs']:
-            lines.append("")
-            lines.append("  Recent Logs:")
-            for log in container['logs']:
-                # Truncate long lines
-                log_line = log[:100] + '...' if len(log) > 100 else log
-                lines.append(f"    {log_line}")
+            write("\n")
+            write("  Recent Logs:\n")
+            write("".join(f"    {_truncate(log)}\n" for log in container['logs']))
 
-        lines.append("")
+        write("\n")
 
     # Network info
     if network['exists']:
-        lines.append("Network: awf-net")
-        lines.append(f"  Subnet: {network['subnet']}")
+        write("Network: awf-net\n")
+        write(f"  Subnet: {network['subnet']}\n")
         if network.get('gateway'):
-            lines.append(f"  Gateway: {network['gateway']}")
+            write(f"  Gateway: {network['gateway']}\n")
         if network.get('containers'):
-            lines.append(f"  Containers: {', '.join(network['containers'])}")
+            write(f"  Containers: {', '.join(network['containers'])}\n")
     else:
-        lines.append("Network: awf-net (not found)")
-
-    return "\n".join(lines)
+        write("Network: awf-net (not found)\n")
 
 
 def format_json_output(containers: List[Dict], network: Dict) -> str:
@@ -238,17 +237,28 @@ Examples:
     args = parser.parse_args()
 
     # Inspect containers
-    container_names = [args.container] if args.container else ['awf-squid', 'awf-agent']
-    containers = [inspect_container(name, args.tail) for name in container_names]
+    container_names = [args.container] if args.container else list(common.AWF_CONTAINERS)
+    inspected = common.batch_inspect(list(common.AWF_CONTAINERS))
+
+    # Per-container calls and the network lookup only wait on docker, so
+    # run them in parallel
+    with ThreadPoolExecutor(max_workers=len(container_names) + 1) as executor:
+        futures = [
+            executor.submit(inspect_container, name, inspected.get(name), args.tail)
+            for name in container_names
+        ]
+
+        # Get network info
+        network_future = executor.submit(get_network_info, inspected)
 
-    # Get network info
-    network = get_network_info()
+        containers = [f.result() for f in futures]
+        network = network_future.result()
 
     # Output
     if args.format == 'json':
         print(format_json_output(containers, network))
     else:
-        print(format_text_output(containers, network, args.logs_only))
+        write_text_output(containers, network, args.logs_only)
 
     # Exit code: 0 if all found, 1 if any missing, 2 for error
     missing_count = sum(1 for c in containers if c['status'] == 'missing')
@@ -7,9 +7,11 @@ Provides actionable insights on blocked traffic.
 import sys
 import os
 import argparse
+import heapq
 from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List
+from operator import itemgetter
+from typing import Dict, List, Optional, TextIO, Tuple
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.dirname(__file__))
@@ -23,100 +25,104 @@ def parse_logs(log_path: str, options: Dict) -> Dict:
     Returns:
         Dict with summary and per-domain statistics
     """
-    lines = common.read_squid_logs(log_path)
+    # Time range filtering
+    if options.get('time_range'):
+        # TODO: Implement time range filtering
+        pass
 
-    # Aggregate by domain
-    stats = defaultdict(lambda: {'allowed': 0, 'blocked': 0, 'total': 0})
-    total_requests = 0
+    domain_filter = options.get('domain')
+    blocked_only = options.get('blocked_only')
+
+    def select(key: Tuple[str, bool]) -> bool:
+        domain, is_allowed = key
+
+        # Domain filtering
+        if domain_filter and domain_filter not in domain:
+            return False
+
+        # Blocked-only filtering
+        if blocked_only and is_allowed:
+            return False
+
+        return bool(domain) and domain != '-'
+
+    # Lines are counted per distinct (domain, is_allowed) pair in common,
+    # after grep drops lines that can't match the domain filter;
+    # min_ts/max_ts are +/-inf if nothing matched
+    counts, min_ts, max_ts = common.count_squid_records(
+        log_path, select, [domain_filter] if domain_filter else None
+    )
+
+    # Aggregate by domain (blocked = total - allowed); domain_totals keeps
+    # first-seen order, which breaks ties when sorting
+    domain_totals = defaultdict(int)
+    allowed_counts = defaultdict(int)
     total_allowed = 0
     total_blocked = 0
-    min_ts = None
-    max_ts = None
 
-    for line in lines:
-        entry = common.parse_squid_log_line(line)
-        if not entry:
-            continue
+    for (domain, is_allowed), count in counts.items():
+        domain_totals[domain] += count
+        if is_allowed:
+            allowed_counts[domain] += count
+            total_allowed += count
+        else:
+            total_blocked += count
 
-        # Time range filtering
-        if options.get('time_range'):
-            # TODO: Implement time range filtering
-            pass
+    total_requests = total_allowed + total_blocked
 
-        # Domain filtering
-        if options.get('domain') and options['domain'] not in entry['domain']:
-            continue
+    # Sort by total count (descending); with a top N limit, select the N
+    # largest with a heap instead of sorting every domain
+    by_total = itemgetter(1)
+    if options.get('top'):
+        ranked = heapq.nlargest(options['top'], domain_totals.items(), key=by_total)
+    else:
+        ranked = sorted(domain_totals.items(), key=by_total, reverse=True)
 
-        # Blocked-only filtering
-        if options.get('blocked_only') and entry['is_allowed']:
-            continue
-
-        # Update stats
-        domain = entry['domain']
-        if domain and domain != '-':
-            if entry['is_allowed']:
-                stats[domain]['allowed'] += 1
-                total_allowed += 1
-            else:
-                stats[domain]['blocked'] += 1
-                total_blocked += 1
-
-            stats[domain]['total'] += 1
-            total_requests += 1
-
-            # Track time range
-            ts = entry['timestamp']
-            if min_ts is None or ts < min_ts:
-                min_ts = ts
-            if max_ts is None or ts > max_ts:
-                max_ts = ts
-
-    # Convert to list and sort
+    # Convert to list
     domain_list = [
         {
             'domain': domain,
-            'allowed': counts['allowed'],
-            'blocked': counts['blocked'],
-            'total': counts['total']
+            'allowed': allowed_counts.get(domain, 0),
+            'blocked': total - allowed_counts.get(domain, 0),
+            'total': total
         }
-        for domain, counts in stats.items()
+        for domain, total in ranked
     ]
 
-    # Sort by total count (descending)
-    domain_list.sort(key=lambda x: x['total'], reverse=True)
-
-    # Apply top N limit
-    if options.get('top'):
-        domain_list = domain_list[:options['top']]
-
     return {
         'summary': {
             'total': total_requests,
             'allowed': total_allowed,
             'blocked': total_blocked,
             'time_range': {
-                'start': datetime.fromtimestamp(min_ts).isoformat() if min_ts else None,
-                'end': datetime.fromtimestamp(max_ts).isoformat() if max_ts else None
-            } if min_ts else None
+                'start': datetime.fromtimestamp(min_ts).isoformat(),
+                'end': datetime.fromtimestamp(max_ts).isoformat()
+            } if min_ts != float('inf') else None
         },
         'domains': domain_list
     }
 
 
-def format_table_output(data: Dict, blocked_only: bool) -> str:
-    """Format results as table."""
+def write_table_output(data: Dict, blocked_only: bool, out: Optional[TextIO] = None) -> None:
+    """
+    Write results as table.
+
+    Rows go straight to out (default: stdout) instead of being joined into
+    one string first, so long domain lists aren't held twice.
+    """
     summary = data['summary']
     domains = data['domains']
 
-    lines = []
+    out = out or sys.stdout
+    write = out.write
 
     # Title
     if blocked_only:
-        lines.append("Blocked Domains (sorted by count):")
+        write("Blocked Domains (sorted by count):\n")
     else:
-        lines.append("Domain Statistics (sorted by total requests):")
+        write("Domain Statistics (sorted by total requests):\n")
 
-    lines.append("")
+    write("\n")
 
     # Table
     if domains:
@@ -125,26 +131,24 @@ def format_table_output(data: Dict, blocked_only: bool) -> str:
             [d['domain'], str(d['blocked']), str(d['allowed']), str(d['total'])]
             for d in domains
         ]
-        lines.append(common.format_table(headers, rows))
+        common.write_table(headers, rows, out)
     else:
-        lines.append("No matching domains found.")
+        write("No matching domains found.\n")
 
-    lines.append("")
+    write("\n")
 
     # Summary
-    lines.append(f"Total requests: {summary['total']}")
+    write(f"Total requests: {summary['total']}\n")
     if summary['total'] > 0:
         blocked_pct = (summary['blocked'] / summary['total']) * 100
         allowed_pct = (summary['allowed'] / summary['total']) * 100
-        lines.append(f"Blocked: {summary['blocked']} ({blocked_pct:.1f}%)")
-        lines.append(f"Allowed: {summary['allowed']} ({allowed_pct:.1f}%)")
+        write(f"Blocked: {summary['blocked']} ({blocked_pct:.1f}%)\n")
+        write(f"Allowed: {summary['allowed']} ({allowed_pct:.1f}%)\n")
 
     if summary.get('time_range'):
         tr = summary['time_range']
-        lines.append("")
-        lines.append(f"Time range: {tr['start']} to {tr['end']}")
-
-    return "\n".join(lines)
+        write("\n")
+        write(f"Time range: {tr['start']} to {tr['end']}\n")
 
 
 def format_json_output(data: Dict) -> str:
@@ -175,12 +179,15 @@ Examples:
 
   # JSON output
   %(prog)s --format json
+
+  # Read log from stdin
+  zcat access.log.1.gz | %(prog)s --log-file -
         """
     )
 
     parser.add_argument(
         '--log-file',
-        help='Path to Squid access.log (auto-discovers if not specified)'
+        help='Path to Squid access.log, or - to read stdin (auto-discovers if not specified)'
     )
     parser.add_argument(
         '--blocked-only',
@@ -244,7 +251,7 @@ Examples:
     if args.format == 'json':
         print(format_json_output(data))
     else:
-        print(format_table_output(data, args.blocked_only))
+        write_table_output(data, args.blocked_only)
 
     # Exit code: 0 if no blocked, 1 if some blocked
     sys.exit(0 if data['summary']['blocked'] == 0 else 1)
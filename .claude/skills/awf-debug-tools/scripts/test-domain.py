@@ -7,43 +7,70 @@ Checks allowlist and Squid logs to determine status.
 import sys
 import os
 import argparse
-from typing import Dict, Optional
+import functools
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 import common
 
 
-def check_allowlist(domain: str) -> tuple[bool, Optional[str]]:
+@functools.lru_cache(maxsize=8)
+def _allowlist_index(allowed_domains: Tuple[str, ...]) -> Tuple[FrozenSet[str], Dict[str, str]]:
+    """
+    Index allowlist patterns for lookups.
+
+    Returns the patterns as a set for exact matches, and a map from each
+    pattern with any leading dot stripped to the pattern itself, so a
+    lookup per label boundary of the tested domain finds a match.
+    """
+    index = {}
+    for pattern in allowed_domains:
+        index.setdefault(pattern.lstrip('.'), pattern)
+    return frozenset(allowed_domains), index
+
+
+def check_allowlist(domain: str) -> tuple[bool, Optional[str], List[str]]:
     """
     Check if domain is in Squid allowlist.
 
     Returns:
-        Tuple of (in_allowlist, matched_pattern)
+        Tuple of (in_allowlist, matched_pattern, allowed_domains)
     """
-    config = common.read_squid_config()
-    if config is None:
-        return (False, None)
+    allowed = common.get_allowed_domains_cached()
+    if allowed is None:
+        return (False, None, [])
 
-    allowed_domains = common.get_allowed_domains(config)
+    allowed_domains = list(allowed)
+    patterns, index = _allowlist_index(allowed)
 
     # Check exact match
-    if domain in allowed_domains:
-        return (True, domain)
+    if domain in patterns:
+        return (True, domain, allowed_domains)
 
     # Check subdomain match
     # If allowlist has "github.com" or ".github.com", it matches "api.github.com"
-    for pattern in allowed_domains:
-        if pattern.startswith('.'):
-            # .github.com matches api.github.com
-            if domain.endswith(pattern) or domain.endswith(pattern[1:]):
-                return (True, pattern)
-        else:
-            # github.com matches api.github.com
-            if domain == pattern or domain.endswith('.' + pattern):
-                return (True, pattern)
-
-    return (False, None)
+    suffix = domain
+    while True:
+        pattern = index.get(suffix)
+        if pattern is not None:
+            return (True, pattern, allowed_domains)
+
+        # Walk up one label: api.github.com -> github.com -> com
+        dot = suffix.find('.')
+        if dot < 0:
+            return (False, None, allowed_domains)
+        suffix = suffix[dot + 1:]
+
+
+def _log_status(entry: common.SquidLogEntry) -> Dict:
+    """Summarize a parsed log entry for test results."""
+    return {
+        'found': True,
+        'allowed': entry.is_allowed,
+        'status_code': entry.status_code,
+        'decision': entry.decision
+    }
 
 
 def check_logs(domain: str) -> Optional[Dict]:
@@ -57,30 +84,41 @@ def check_logs(domain: str) -> Optional[Dict]:
     if log_path is None:
         return None
 
-    lines = common.read_squid_logs(log_path)
-
     # Find most recent entry for this domain
-    last_entry = None
-    for line in lines:
-        entry = common.parse_squid_log_line(line)
-        if entry and domain in entry['domain']:
-            last_entry = entry
+    last_entry = common.find_last_squid_entry(log_path, domain)
 
     if last_entry:
-        return {
-            'found': True,
-            'allowed': last_entry['is_allowed'],
-            'status_code': last_entry['status_code'],
-            'decision': last_entry['decision']
-        }
+        return _log_status(last_entry)
 
     return None
 
 
-def test_domain(domain: str, check_allowlist_only: bool, suggest_fix: bool) -> Dict:
+def check_logs_batch(domains: List[str]) -> Dict[str, Dict]:
+    """
+    Check Squid logs for several domains at once.
+
+    Returns:
+        Dict mapping each domain found in the logs to its status info
+    """
+    log_path = common.find_squid_logs()
+    if log_path is None:
+        return {}
+
+    # Find most recent entry per domain
+    last_entries = common.find_last_squid_entries(log_path, domains)
+
+    return {domain: _log_status(entry) for domain, entry in last_entries.items()}
+
+
+def test_domain(domain: str, check_allowlist_only: bool, suggest_fix: bool,
+                log_results: Optional[Dict[str, Dict]] = None) -> Dict:
     """
     Test domain reachability.
 
+    Args:
+        log_results: Pre-fetched check_logs_batch() result; logs are
+            searched for this domain alone if not given
+
     Returns:
         Dict with test results
     """
@@ -95,13 +133,16 @@ def test_domain(domain: str, check_allowlist_only: bool, suggest_fix: bool) -> D
     }
 
     # Check allowlist
-    in_allowlist, matched_pattern = check_allowlist(domain)
+    in_allowlist, matched_pattern, allowed = check_allowlist(domain)
     result['in_allowlist'] = in_allowlist
     result['matched_pattern'] = matched_pattern
 
     # Check logs (unless --check-allowlist)
     if not check_allowlist_only:
-        log_result = check_logs(domain)
+        if log_results is None:
+            log_result = check_logs(domain)
+        else:
+            log_result = log_results.get(domain)
         if log_result:
             result['in_logs'] = True
             result['log_status'] = {
@@ -130,14 +171,9 @@ def test_domain(domain: str, check_allowlist_only: bool, suggest_fix: bool) -> D
 
     # Generate suggestion
     if suggest_fix and not in_allowlist:
-        # Check if we can infer existing domains
-        config = common.read_squid_config()
-        if config:
-            allowed = common.get_allowed_domains(config)
-            if allowed:
-                suggestion = f"awf --allow-domains {','.join(allowed)},{domain} 'your-command'"
-            else:
-                suggestion = f"awf --allow-domains {domain} 'your-command'"
+        # Keep the existing allowlist (already loaded by check_allowlist)
+        if allowed:
+            suggestion = f"awf --allow-domains {','.join(allowed)},{domain} 'your-command'"
         else:
             suggestion = f"awf --allow-domains {domain} 'your-command'"
 
@@ -146,6 +182,38 @@ def test_domain(domain: str, check_allowlist_only: bool, suggest_fix: bool) -> D
     return result
 
 
+def test_domains(domains: List[str], check_allowlist_only: bool, suggest_fix: bool) -> List[Dict]:
+    """
+    Test reachability of several domains.
+
+    The allowlist is loaded and the log source located once for all
+    domains.
+
+    Returns:
+        List of test result dicts, in input order
+    """
+    log_results = {} if check_allowlist_only else check_logs_batch(domains)
+    return [
+        test_domain(domain, check_allowlist_only, suggest_fix, log_results)
+        for domain in domains
+    ]
+
+
+def read_domains_file(path: str) -> List[str]:
+    """
+    Read domains to test, one per line ('-' reads stdin).
+
+    Blank lines and # comments are ignored.
+    """
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
 def format_text_output(result: Dict) -> str:
     """Format results as text."""
     lines = []
@@ -192,7 +260,7 @@ def format_text_output(result: Dict) -> str:
     return "\n".join(lines)
 
 
-def format_json_output(result: Dict) -> str:
+def format_json_output(result: Union[Dict, List[Dict]]) -> str:
     """Format results as JSON."""
     return common.format_json(result, pretty=True)
 
@@ -217,12 +285,23 @@ Examples:
 
   # JSON output
   %(prog)s github.com --format json
+
+  # Test several domains at once
+  %(prog)s github.com npmjs.org pypi.org
+  cat domains.txt | %(prog)s --domains-file -
         """
     )
 
     parser.add_argument(
-        'domain',
-        help='Domain to test (e.g., github.com)'
+        'domains',
+        nargs='*',
+        metavar='domain',
+        help='Domain(s) to test (e.g., github.com)'
+    )
+    parser.add_argument(
+        '--domains-file',
+        metavar='FILE',
+        help='Read domains to test from FILE, one per line (- for stdin)'
     )
     parser.add_argument(
         '--check-allowlist',
@@ -243,18 +322,43 @@ Examples:
 
     args = parser.parse_args()
 
-    # Test domain
-    result = test_domain(args.domain, args.check_allowlist, args.suggest_fix)
+    domains = list(args.domains)
+    if args.domains_file:
+        try:
+            domains.extend(read_domains_file(args.domains_file))
+        except OSError as e:
+            print(f"Error reading domains file: {e}", file=sys.stderr)
+            sys.exit(2)
+
+    # Drop duplicates, keeping order
+    domains = list(dict.fromkeys(domains))
+    if not domains:
+        parser.error('at least one domain is required')
+
+    if len(domains) == 1:
+        # Test domain
+        result = test_domain(domains[0], args.check_allowlist, args.suggest_fix)
+
+        # Output
+        if args.format == 'json':
+            print(format_json_output(result))
+        else:
+            print(format_text_output(result))
 
-    # Output
-    if args.format == 'json':
-        print(format_json_output(result))
+        results = [result]
     else:
-        print(format_text_output(result))
+        # Test all domains against one allowlist load and log lookup
+        results = test_domains(domains, args.check_allowlist, args.suggest_fix)
+
+        # Output
+        if args.format == 'json':
+            print(format_json_output(results))
+        else:
+            print("\n\n".join(format_text_output(result) for result in results))
 
-    # Exit code: 0 if allowed, 1 if blocked/not in allowlist
-    is_allowed = 'ALLOWED' in result['status']
-    sys.exit(0 if is_allowed else 1)
+    # Exit code: 0 if all allowed, 1 if any blocked/not in allowlist
+    all_allowed = all('ALLOWED' in result['status'] for result in results)
+    sys.exit(0 if all_allowed else 1)
 
 
 if __name__ == '__main__':